@@ -19,7 +19,7 @@ Moderation logic (ignores API action):
   • violations >= BAN_VIOLATION_THRESHOLD AND confidence >= BAN_CONFIDENCE_THRESHOLD → ban
 
 Install:
-  pip install "discord.py>=2.3" httpx python-dotenv aiofiles
+  pip install "discord.py>=2.3" aiohttp orjson python-dotenv aiofiles uvloop
 
 .env:
   DISCORD_TOKEN=your-bot-token
@@ -31,14 +31,20 @@ Install:
 """
 
 import io
-import json
+import re
+import time
+import hashlib
+import orjson
+import asyncio
 import sqlite3
 import os
-import httpx
+import sys
+import threading
+from collections import OrderedDict
+import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands
-from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -53,24 +59,94 @@ LOG_CHANNEL_NAME = os.getenv("LOG_CHANNEL_NAME", "mokosh-log")
 BAN_VIOLATION_THRESHOLD  = 2
 BAN_CONFIDENCE_THRESHOLD = 0.80
 
+# ── Caching ────────────────────────────────────
+VERDICT_CACHE_TTL = 3600   # seconds a cached text verdict stays valid
+VERDICT_PRUNE_EVERY = 300  # seconds between sweeps of expired verdicts
+CHECK_CACHE_TTL   = 300    # seconds a /check result is reused
+CHECK_CACHE_MAX   = 2048   # entries kept before expired ones are pruned
+SETTINGS_CACHE_MAX   = 10_000    # guilds kept in memory (LRU, unflushed entries pinned)
+VIOLATIONS_CACHE_MAX = 200_000   # (guild, user) counts kept in memory, same policy
+
 
 def api_headers() -> dict:
     return {"X-API-Token": API_TOKEN} if API_TOKEN else {}
 
 
+# Built once at import — reused by every API call
+API_HEADERS  = api_headers()
+JSON_HEADERS = {"Content-Type": "application/json", **API_HEADERS}
+
+_EP_TEXT  = f"{API_URL}/analyze/messages"
+_EP_IMAGE = f"{API_URL}/analyze/image"
+_EP_AUDIO = f"{API_URL}/analyze/audio"
+_EP_VIDEO = f"{API_URL}/analyze/video"
+
+# Per-endpoint timeouts: connect covers waiting for a pooled connection too,
+# sock_read bounds each stall while the API is producing its answer.
+TIMEOUT_TEXT  = aiohttp.ClientTimeout(total=20.0, connect=5.0, sock_connect=5.0, sock_read=15.0)
+TIMEOUT_IMAGE = aiohttp.ClientTimeout(total=30.0, connect=5.0, sock_connect=5.0, sock_read=25.0)
+TIMEOUT_AUDIO = aiohttp.ClientTimeout(total=40.0, connect=5.0, sock_connect=5.0, sock_read=35.0)
+TIMEOUT_VIDEO = aiohttp.ClientTimeout(total=60.0, connect=5.0, sock_connect=5.0, sock_read=55.0)
+
+
+# Shared pooled session — created in on_ready, closed in MokoshBot.close().
+# It also fetches Discord CDN attachments, so the API token is sent per request.
+SESSION: aiohttp.ClientSession | None = None
+
+
+def open_session() -> aiohttp.ClientSession:
+    global SESSION
+    if SESSION is None or SESSION.closed:
+        SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=60),
+        )
+    return SESSION
+
+
+async def close_session():
+    global SESSION
+    if SESSION is not None:
+        await SESSION.close()
+        SESSION = None
+
+
+def media_form(
+    fields: dict,
+    file_data: bytes | aiohttp.StreamReader,
+    filename: str,
+    content_type: str,
+) -> aiohttp.FormData:
+    """A StreamReader is uploaded chunk by chunk as it is received."""
+    form = aiohttp.FormData()
+    for name, value in fields.items():
+        form.add_field(name, value)
+    form.add_field("file", file_data, filename=filename, content_type=content_type)
+    return form
+
+
 # ═══════════════════════════════════════════════
 # DATABASE
 # ═══════════════════════════════════════════════
 
+# One process-wide connection in autocommit mode; DB_LOCK serializes access
+DB      = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+DB.row_factory = sqlite3.Row
+DB_LOCK = threading.Lock()
+
+
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("""
+    with DB_LOCK:
+        DB.execute("PRAGMA journal_mode=WAL")
+        DB.execute("PRAGMA synchronous=NORMAL")
+        DB.execute("PRAGMA temp_store=MEMORY")
+        DB.execute("""
             CREATE TABLE IF NOT EXISTS guild_settings (
                 guild_id INTEGER PRIMARY KEY,
                 settings TEXT NOT NULL
             )
         """)
-        conn.execute("""
+        DB.execute("""
             CREATE TABLE IF NOT EXISTS violations (
                 guild_id INTEGER NOT NULL,
                 user_id  INTEGER NOT NULL,
@@ -78,18 +154,14 @@ def init_db():
                 PRIMARY KEY (guild_id, user_id)
             )
         """)
-        conn.commit()
-
-
-@contextmanager
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    finally:
-        conn.close()
+        DB.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts_cache (
+                hash   TEXT PRIMARY KEY,
+                result BLOB NOT NULL,
+                ts     INTEGER NOT NULL
+            )
+        """)
+        DB.execute("DELETE FROM verdicts_cache WHERE ts < ?", (int(time.time()) - VERDICT_CACHE_TTL,))
 
 
 DEFAULT_SETTINGS = {
@@ -105,124 +177,376 @@ DEFAULT_SETTINGS = {
 }
 
 
-def get_settings(guild_id: int) -> dict:
-    with get_conn() as conn:
-        row = conn.execute(
-            "SELECT settings FROM guild_settings WHERE guild_id = ?", (guild_id,)
-        ).fetchone()
-    return {**DEFAULT_SETTINGS, **json.loads(row["settings"])} if row else dict(DEFAULT_SETTINGS)
+# Write-behind buffers, flushed to disk in one transaction by flush_loop().
+# _flushing_* hold the batch currently being written, until it is on disk.
+FLUSH_INTERVAL = 0.5
+_pending_writes:    dict[tuple[int, int], int] = {}
+_pending_settings:  dict[int, dict]            = {}
+_pending_verdicts:  dict[str, tuple[bytes, int]] = {}
+_flushing_writes:   dict[tuple[int, int], int] = {}
+_flushing_settings: dict[int, dict]            = {}
+FLUSH_TASK: asyncio.Task | None = None
+
+
+class LRUCache:
+    """Size-bounded LRU that never evicts keys still waiting to reach the DB.
+
+    Touched from the event loop and from to_thread workers, hence the lock.
+    """
+
+    def __init__(self, maxsize: int, *pinned: dict):
+        self._data    = OrderedDict()
+        self._lock    = threading.Lock()
+        self._maxsize = maxsize
+        self._pinned  = pinned
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def setdefault(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+            self._data[key] = value
+            self._evict()
+            return value
+
+    def _evict(self):
+        excess = len(self._data) - self._maxsize
+        if excess <= 0:
+            return
+        victims = []
+        for key in self._data:   # oldest first
+            if not any(key in p for p in self._pinned):
+                victims.append(key)
+                if len(victims) == excess:
+                    break
+        for key in victims:
+            del self._data[key]
+
+
+# In-process caches — every write goes through save_settings / set_violations,
+# so they stay coherent with the DB. Evicted entries are simply re-read.
+SETTINGS_CACHE   = LRUCache(SETTINGS_CACHE_MAX, _pending_settings, _flushing_settings)
+VIOLATIONS_CACHE = LRUCache(VIOLATIONS_CACHE_MAX, _pending_writes, _flushing_writes)
+
+
+def _get_settings_sync(guild_id: int) -> dict:
+    cached = SETTINGS_CACHE.get(guild_id)
+    if cached is None:
+        with DB_LOCK:
+            row = DB.execute(
+                "SELECT settings FROM guild_settings WHERE guild_id = ?", (guild_id,)
+            ).fetchone()
+        loaded = {**DEFAULT_SETTINGS, **orjson.loads(row["settings"])} if row else dict(DEFAULT_SETTINGS)
+        # setdefault: a save_settings() that raced this read must win
+        cached = SETTINGS_CACHE.setdefault(guild_id, loaded)
+    return dict(cached)
 
 
 def save_settings(guild_id: int, settings: dict):
-    with get_conn() as conn:
-        conn.execute(
-            """INSERT INTO guild_settings (guild_id, settings) VALUES (?, ?)
-               ON CONFLICT(guild_id) DO UPDATE SET settings = excluded.settings""",
-            (guild_id, json.dumps(settings)),
-        )
-
-
-def get_violations(guild_id: int, user_id: int) -> int:
-    with get_conn() as conn:
-        row = conn.execute(
+    # Queue first so the new entry is pinned before it can be evicted
+    _pending_settings[guild_id] = dict(settings)
+    SETTINGS_CACHE[guild_id]    = dict(settings)
+
+
+def _get_violations_sync(guild_id: int, user_id: int) -> int:
+    key    = (guild_id, user_id)
+    cached = VIOLATIONS_CACHE.get(key)
+    if cached is not None:
+        return cached
+    with DB_LOCK:
+        row = DB.execute(
             "SELECT count FROM violations WHERE guild_id = ? AND user_id = ?",
             (guild_id, user_id),
         ).fetchone()
-    return row["count"] if row else 0
+    return VIOLATIONS_CACHE.setdefault(key, row["count"] if row else 0)
 
 
 def set_violations(guild_id: int, user_id: int, count: int):
-    with get_conn() as conn:
-        conn.execute(
-            """INSERT INTO violations (guild_id, user_id, count) VALUES (?, ?, ?)
-               ON CONFLICT(guild_id, user_id) DO UPDATE SET count = excluded.count""",
-            (guild_id, user_id, count),
-        )
+    _pending_writes[(guild_id, user_id)]  = count
+    VIOLATIONS_CACHE[(guild_id, user_id)] = count
+
+
+def _flush_sync(
+    violations: dict[tuple[int, int], int],
+    settings: dict[int, dict],
+    verdicts: dict[str, tuple[bytes, int]],
+):
+    with DB_LOCK:
+        DB.execute("BEGIN")
+        try:
+            DB.executemany(
+                """INSERT INTO violations (guild_id, user_id, count) VALUES (?, ?, ?)
+                   ON CONFLICT(guild_id, user_id) DO UPDATE SET count = excluded.count""",
+                [(g, u, c) for (g, u), c in violations.items()],
+            )
+            DB.executemany(
+                """INSERT INTO guild_settings (guild_id, settings) VALUES (?, ?)
+                   ON CONFLICT(guild_id) DO UPDATE SET settings = excluded.settings""",
+                [(g, orjson.dumps(st).decode()) for g, st in settings.items()],
+            )
+            DB.executemany(
+                "INSERT OR REPLACE INTO verdicts_cache (hash, result, ts) VALUES (?, ?, ?)",
+                [(k, raw, ts) for k, (raw, ts) in verdicts.items()],
+            )
+            DB.execute("COMMIT")
+        except Exception:
+            DB.execute("ROLLBACK")
+            raise
+
+
+async def flush_pending():
+    if not (_pending_writes or _pending_settings or _pending_verdicts):
+        return
+    violations = dict(_pending_writes)
+    settings   = dict(_pending_settings)
+    verdicts   = dict(_pending_verdicts)
+    _pending_writes.clear()
+    _pending_settings.clear()
+    _pending_verdicts.clear()
+    # Keep the batch pinned in the caches until it is committed
+    _flushing_writes.update(violations)
+    _flushing_settings.update(settings)
+    try:
+        await asyncio.to_thread(_flush_sync, violations, settings, verdicts)
+    except Exception as e:
+        print(f"[ERROR] DB flush failed: {e}")
+        # Re-queue, but keep anything newer written meanwhile
+        for k, v in violations.items():
+            _pending_writes.setdefault(k, v)
+        for k, v in settings.items():
+            _pending_settings.setdefault(k, v)
+        for k, v in verdicts.items():
+            _pending_verdicts.setdefault(k, v)
+    finally:
+        _flushing_writes.clear()
+        _flushing_settings.clear()
+
+
+def _prune_verdicts_sync():
+    with DB_LOCK:
+        DB.execute("DELETE FROM verdicts_cache WHERE ts < ?", (int(time.time()) - VERDICT_CACHE_TTL,))
+
+
+async def flush_loop():
+    last_prune = time.monotonic()
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await flush_pending()
+        if time.monotonic() - last_prune >= VERDICT_PRUNE_EVERY:
+            last_prune = time.monotonic()
+            try:
+                await asyncio.to_thread(_prune_verdicts_sync)
+            except Exception as e:
+                print(f"[ERROR] verdict cache prune failed: {e}")
+
+
+def start_flush_loop():
+    global FLUSH_TASK
+    if FLUSH_TASK is None or FLUSH_TASK.done():
+        FLUSH_TASK = asyncio.create_task(flush_loop())
+
+
+async def stop_flush_loop():
+    global FLUSH_TASK
+    if FLUSH_TASK is not None:
+        FLUSH_TASK.cancel()
+        FLUSH_TASK = None
+    await flush_pending()
+
+
+# ─── Text verdict cache ─────────────────────────
+# Exact-match on (text, settings), so repeated spam, including a repeat
+# offender's, is answered without the API. Sender-addressed notes are stripped:
+# a hit shows no AI note rather than one written for someone else.
+
+_SENDER_FIELDS = ("sender_response", "response")
+
+
+def verdict_key(text: str, settings: dict) -> str:
+    h = hashlib.blake2b(text.encode(), digest_size=16)
+    h.update(orjson.dumps(settings, option=orjson.OPT_SORT_KEYS))
+    return h.hexdigest()
+
+
+def _shareable(result: dict) -> dict:
+    return {k: v for k, v in result.items() if k not in _SENDER_FIELDS}
+
+
+def _get_cached_verdict_sync(key: str) -> dict | None:
+    with DB_LOCK:
+        row = DB.execute(
+            "SELECT result, ts FROM verdicts_cache WHERE hash = ?", (key,)
+        ).fetchone()
+    if row and time.time() - row["ts"] < VERDICT_CACHE_TTL:
+        # Rows from before sender fields were stripped may still carry them
+        return _shareable(orjson.loads(row["result"]))
+    return None
+
+
+def put_cached_verdict(key: str, result: dict):
+    """Queued for the next flush_loop() write, like settings and violations."""
+    _pending_verdicts[key] = (orjson.dumps(_shareable(result)), int(time.time()))
+
+
+# Async wrappers — DB work runs on a worker thread so it never blocks the loop
+async def get_settings(guild_id: int) -> dict:
+    cached = SETTINGS_CACHE.get(guild_id)
+    if cached is not None:
+        return dict(cached)
+    return await asyncio.to_thread(_get_settings_sync, guild_id)
+
+
+async def get_violations(guild_id: int, user_id: int) -> int:
+    cached = VIOLATIONS_CACHE.get((guild_id, user_id))
+    if cached is not None:
+        return cached
+    return await asyncio.to_thread(_get_violations_sync, guild_id, user_id)
+
+
+async def get_cached_verdict(key: str) -> dict | None:
+    pending = _pending_verdicts.get(key)
+    if pending is not None:
+        return orjson.loads(pending[0])
+    return await asyncio.to_thread(_get_cached_verdict_sync, key)
 
 
 # ═══════════════════════════════════════════════
 # API CALLERS
 # ═══════════════════════════════════════════════
 
-async def api_text(text: str, sender_id: str, sender_display: str, prior: int, settings: dict) -> dict | None:
-    async with httpx.AsyncClient() as client:
-        try:
-            r = await client.post(
-                f"{API_URL}/analyze/messages",
-                headers=api_headers(),
-                json={
-                    "messages": [{
-                        "sender_id":        sender_id,
-                        "sender_display":   sender_display,
-                        "text":             text,
-                        "prior_violations": prior,
-                    }],
-                    "settings": settings,
-                },
-                timeout=20.0,
-            )
-            data = r.json()
-            print(f"[DEBUG] /analyze/messages → {r.status_code} {data}")
-            if isinstance(data, dict) and "results" in data:
-                return data["results"][0]
-            return data
-        except Exception as e:
-            print(f"[ERROR] /analyze/messages failed: {e}")
-            return None
+async def api_text(
+    text: str,
+    sender_id: str,
+    sender_display: str,
+    prior: int,
+    settings: dict,
+    verdict_only: bool = True,
+) -> dict | None:
+    key = verdict_key(text, settings) if verdict_only else None
+    try:
+        if key:
+            cached = await get_cached_verdict(key)
+            if cached is not None:
+                return cached
+        async with open_session().post(
+            _EP_TEXT,
+            headers=JSON_HEADERS,
+            data=orjson.dumps({
+                "messages": [{
+                    "sender_id":        sender_id,
+                    "sender_display":   sender_display,
+                    "text":             text,
+                    "prior_violations": prior,
+                }],
+                "settings": settings,
+            }),
+            timeout=TIMEOUT_TEXT,
+        ) as r:
+            data = parse_result(await r.read(), verdict_only)
+        print(f"[DEBUG] /analyze/messages → {r.status} {data}")
+        if r.status != 200:
+            return None  # error bodies are not verdicts; never cache them
+        if isinstance(data, dict) and "results" in data:
+            data = data["results"][0]
+        if key and isinstance(data, dict):
+            put_cached_verdict(key, data)
+        return data
+    except Exception as e:
+        print(f"[ERROR] /analyze/messages failed: {e}")
+        return None
 
 
-async def api_image(file_bytes: bytes, filename: str, caption: str | None, prior: int, sender_label: str) -> dict | None:
-    async with httpx.AsyncClient() as client:
-        try:
-            data = {"prior_violations": str(prior), "sender_label": sender_label}
-            if caption:
-                data["caption"] = caption
-            r = await client.post(
-                f"{API_URL}/analyze/image",
-                headers=api_headers(),
-                data=data,
-                files={"file": (filename, file_bytes, "image/jpeg")},
-                timeout=30.0,
-            )
-            return r.json()
-        except Exception as e:
-            print(f"[ERROR] /analyze/image failed: {e}")
-            return None
+async def api_image(
+    file_bytes: bytes,
+    filename: str,
+    caption: str | None,
+    prior: int,
+    sender_label: str,
+    content_type: str = "image/jpeg",
+) -> dict | None:
+    try:
+        data = {"prior_violations": str(prior), "sender_label": sender_label}
+        if caption:
+            data["caption"] = caption
+        async with open_session().post(
+            _EP_IMAGE,
+            headers=API_HEADERS,
+            data=media_form(data, file_bytes, filename, content_type),
+            timeout=TIMEOUT_IMAGE,
+        ) as r:
+            return parse_result(await r.read())
+    except Exception as e:
+        print(f"[ERROR] /analyze/image failed: {e}")
+        return None
 
 
-async def api_audio(file_bytes: bytes, filename: str, prior: int, sender_label: str) -> dict | None:
-    async with httpx.AsyncClient() as client:
-        try:
-            r = await client.post(
-                f"{API_URL}/analyze/audio",
-                headers=api_headers(),
-                data={"prior_violations": str(prior), "sender_label": sender_label},
-                files={"file": (filename, file_bytes, "audio/ogg")},
-                timeout=40.0,
-            )
-            return r.json()
-        except Exception as e:
-            print(f"[ERROR] /analyze/audio failed: {e}")
-            return None
+async def api_audio(
+    file_bytes: bytes,
+    filename: str,
+    prior: int,
+    sender_label: str,
+    content_type: str = "audio/ogg",
+) -> dict | None:
+    try:
+        data = {"prior_violations": str(prior), "sender_label": sender_label}
+        async with open_session().post(
+            _EP_AUDIO,
+            headers=API_HEADERS,
+            data=media_form(data, file_bytes, filename, content_type),
+            timeout=TIMEOUT_AUDIO,
+        ) as r:
+            return parse_result(await r.read())
+    except Exception as e:
+        print(f"[ERROR] /analyze/audio failed: {e}")
+        return None
 
 
-async def api_video(file_bytes: bytes, filename: str, caption: str | None, prior: int, sender_label: str) -> dict | None:
-    async with httpx.AsyncClient() as client:
-        try:
-            data = {"prior_violations": str(prior), "sender_label": sender_label}
-            if caption:
-                data["caption"] = caption
-            r = await client.post(
-                f"{API_URL}/analyze/video",
-                headers=api_headers(),
-                data=data,
-                files={"file": (filename, file_bytes, "video/mp4")},
-                timeout=60.0,
-            )
-            return r.json()
-        except Exception as e:
-            print(f"[ERROR] /analyze/video failed: {e}")
-            return None
+async def api_video(
+    file_data: bytes | aiohttp.StreamReader,
+    filename: str,
+    caption: str | None,
+    prior: int,
+    sender_label: str,
+    content_type: str = "video/mp4",
+) -> dict | None:
+    try:
+        data = {"prior_violations": str(prior), "sender_label": sender_label}
+        if caption:
+            data["caption"] = caption
+        async with open_session().post(
+            _EP_VIDEO,
+            headers=API_HEADERS,
+            data=media_form(data, file_data, filename, content_type),
+            timeout=TIMEOUT_VIDEO,
+        ) as r:
+            return parse_result(await r.read())
+    except Exception as e:
+        print(f"[ERROR] /analyze/video failed: {e}")
+        return None
+
+
+SAFE_RESULT = {"is_bad": False}
+
+
+def parse_result(raw: bytes, verdict_only: bool = True) -> dict:
+    """Decode an API response; with verdict_only, safe verdicts skip the full parse."""
+    if (verdict_only and b'"is_bad":false' in raw
+            and b'"is_bad":true' not in raw and b'"status":"bad"' not in raw):
+        return dict(SAFE_RESULT)
+    return orjson.loads(raw)
 
 
 def is_bad_result(result: dict) -> bool:
@@ -237,14 +561,48 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members         = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class MokoshBot(commands.Bot):
+    async def close(self):
+        await stop_flush_loop()
+        await close_session()
+        await super().close()
+
+
+bot = MokoshBot(command_prefix="!", intents=intents)
+
+
+# ─── Background tasks ───────────────────────────
+
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+
+def spawn(coro) -> asyncio.Task:
+    """create_task that keeps a strong reference until the task finishes."""
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
 
 
 # ─── Log channel helper ──────────────────────────
 
+_LOG_CHANNELS: dict[int, int] = {}   # guild.id → log channel id
+
+
+def find_log_channel(guild: discord.Guild) -> discord.TextChannel | None:
+    """Cached lookup; scans the guild's channels only on a cache miss."""
+    cid = _LOG_CHANNELS.get(guild.id)
+    channel = guild.get_channel(cid) if cid else None
+    if channel is None:
+        channel = discord.utils.get(guild.text_channels, name=LOG_CHANNEL_NAME)
+        if channel:
+            _LOG_CHANNELS[guild.id] = channel.id
+    return channel
+
+
 async def get_log_channel(guild: discord.Guild) -> discord.TextChannel | None:
     """Return existing log channel or create it if missing."""
-    existing = discord.utils.get(guild.text_channels, name=LOG_CHANNEL_NAME)
+    existing = find_log_channel(guild)
     if existing:
         return existing
     try:
@@ -256,13 +614,31 @@ async def get_log_channel(guild: discord.Guild) -> discord.TextChannel | None:
         for role in guild.roles:
             if role.permissions.administrator:
                 overwrites[role] = discord.PermissionOverwrite(read_messages=True)
-        return await guild.create_text_channel(LOG_CHANNEL_NAME, overwrites=overwrites)
+        channel = await guild.create_text_channel(LOG_CHANNEL_NAME, overwrites=overwrites)
+        _LOG_CHANNELS[guild.id] = channel.id
+        return channel
     except Exception as e:
         print(f"[WARN] Could not create log channel: {e}")
         return None
 
 
 # ─── Embed builders ─────────────────────────────
+#
+# Embeds are built from plain dicts via Embed.from_dict — one call instead of
+# a chain of set_author/add_field/set_footer.
+
+_ORANGE = discord.Color.orange().value
+_RED    = discord.Color.red().value
+
+_WARN_FOOTER = (
+    f"Ban triggers at {BAN_VIOLATION_THRESHOLD}+ violations "
+    f"with {int(BAN_CONFIDENCE_THRESHOLD*100)}%+ confidence"
+)
+
+
+def _author(member: discord.Member) -> dict:
+    return {"name": str(member), "icon_url": member.display_avatar.url}
+
 
 def warn_embed(
     member: discord.Member,
@@ -271,33 +647,65 @@ def warn_embed(
     violation_count: int,
     media_label: str,
     api_verdict: str,
+    banned: bool = False,
 ) -> discord.Embed:
-    embed = discord.Embed(
-        title="⚠️ Violation Detected",
-        color=discord.Color.orange(),
-    )
-    embed.set_author(name=str(member), icon_url=member.display_avatar.url)
+    fields = []
     if media_label:
-        embed.add_field(name="Content type", value=media_label, inline=True)
-    embed.add_field(name="Category",    value=f"`{categories}`",           inline=True)
-    embed.add_field(name="Confidence",  value=f"`{confidence:.0%}`",       inline=True)
-    embed.add_field(name="Violations",  value=f"`{violation_count}` total", inline=True)
+        fields.append({"name": "Content type", "value": media_label, "inline": True})
+    fields += [
+        {"name": "Category",   "value": f"`{categories}`",            "inline": True},
+        {"name": "Confidence", "value": f"`{confidence:.0%}`",        "inline": True},
+        {"name": "Violations", "value": f"`{violation_count}` total", "inline": True},
+    ]
     if api_verdict:
-        embed.add_field(name="AI note", value=api_verdict[:500], inline=False)
-    embed.set_footer(text=f"Ban triggers at {BAN_VIOLATION_THRESHOLD}+ violations with {int(BAN_CONFIDENCE_THRESHOLD*100)}%+ confidence")
-    return embed
+        fields.append({"name": "AI note", "value": api_verdict[:500], "inline": False})
+    return discord.Embed.from_dict({
+        "title":  "🚫 Final Violation — User Will Be Banned" if banned else "⚠️ Violation Detected",
+        "color":  _RED if banned else _ORANGE,
+        "author": _author(member),
+        "fields": fields,
+        "footer": {"text": _WARN_FOOTER},
+    })
 
 
 def ban_embed(member: discord.Member, confidence: float, violation_count: int) -> discord.Embed:
-    embed = discord.Embed(
-        title="🚫 User Banned",
-        description=f"{member.mention} has been permanently banned.",
-        color=discord.Color.red(),
+    return discord.Embed.from_dict({
+        "title":       "🚫 User Banned",
+        "description": f"{member.mention} has been permanently banned.",
+        "color":       _RED,
+        "author":      _author(member),
+        "fields": [
+            {"name": "Violations", "value": str(violation_count), "inline": True},
+            {"name": "Confidence", "value": f"{confidence:.0%}",  "inline": True},
+        ],
+    })
+
+
+def log_embed(
+    message: discord.Message,
+    member: discord.Member,
+    categories: str,
+    confidence: float,
+    violation_count: int,
+    media_label: str,
+    api_verdict: str,
+    banned: bool,
+) -> discord.Embed:
+    description = (
+        f"**User** {member.mention} (`{member.id}`)\n"
+        f"**Channel** {message.channel.mention}\n"
+        f"**Category** `{categories}`\n"
+        f"**Confidence** `{confidence:.0%}`\n"
+        f"**Violations** {violation_count}\n"
+        + (f"**Media** {media_label}\n" if media_label else "")
+        + (f"\n**AI note** {api_verdict[:500]}" if api_verdict else "")
     )
-    embed.set_author(name=str(member), icon_url=member.display_avatar.url)
-    embed.add_field(name="Violations", value=str(violation_count), inline=True)
-    embed.add_field(name="Confidence", value=f"{confidence:.0%}",  inline=True)
-    return embed
+    return discord.Embed.from_dict({
+        "title":       "🚫 Ban" if banned else "⚠️ Warn",
+        "description": description,
+        "color":       _RED if banned else _ORANGE,
+        "author":      _author(member),
+    })
 
 
 # ─── Core verdict handler ────────────────────────
@@ -322,7 +730,7 @@ async def apply_verdict(
     api_verdict = result.get("sender_response") or result.get("response", "")
 
     # Increment violation count
-    prior     = get_violations(guild_id, user_id)
+    prior     = await get_violations(guild_id, user_id)
     new_count = prior + 1
     set_violations(guild_id, user_id, new_count)
 
@@ -337,10 +745,7 @@ async def apply_verdict(
         print(f"[WARN] Could not delete message: {e}")
 
     # 2. Post warning as reply (in original channel)
-    warn_e = warn_embed(member, categories, confidence, new_count, media_label, api_verdict)
-    if should_ban:
-        warn_e.color = discord.Color.red()
-        warn_e.title = "🚫 Final Violation — User Will Be Banned"
+    warn_e = warn_embed(member, categories, confidence, new_count, media_label, api_verdict, should_ban)
 
     try:
         await message.channel.send(
@@ -353,22 +758,9 @@ async def apply_verdict(
     # 3. Post to log channel
     log_ch = await get_log_channel(guild)
     if log_ch:
-        log_embed = discord.Embed(
-            title="🚫 Ban" if should_ban else "⚠️ Warn",
-            color=discord.Color.red() if should_ban else discord.Color.orange(),
-        )
-        log_embed.set_author(name=str(member), icon_url=member.display_avatar.url)
-        log_embed.add_field(name="User",      value=f"{member.mention} (`{member.id}`)", inline=False)
-        log_embed.add_field(name="Channel",   value=message.channel.mention,             inline=True)
-        log_embed.add_field(name="Category",  value=f"`{categories}`",                   inline=True)
-        log_embed.add_field(name="Confidence",value=f"`{confidence:.0%}`",               inline=True)
-        log_embed.add_field(name="Violations",value=str(new_count),                      inline=True)
-        if media_label:
-            log_embed.add_field(name="Media", value=media_label, inline=True)
-        if api_verdict:
-            log_embed.add_field(name="AI note", value=api_verdict[:500], inline=False)
+        log_e = log_embed(message, member, categories, confidence, new_count, media_label, api_verdict, should_ban)
         try:
-            await log_ch.send(embed=log_embed)
+            await log_ch.send(embed=log_e)
         except Exception as e:
             print(f"[WARN] Could not post to log channel: {e}")
 
@@ -385,69 +777,170 @@ async def apply_verdict(
 # EVENT: MESSAGE
 # ═══════════════════════════════════════════════
 
+ATTACHMENT_LABELS = {"image": "🖼 Image", "audio": "🎙 Audio", "video": "🎥 Video"}
+
+# Checked against attachment.size before anything is downloaded
+IMAGE_MAX = 8  * 1024 * 1024
+AUDIO_MAX = 15 * 1024 * 1024
+VIDEO_MAX = 20 * 1024 * 1024
+ATTACHMENT_MAX = {"image": IMAGE_MAX, "audio": AUDIO_MAX, "video": VIDEO_MAX}
+
+# extension → (kind, MIME type sent to the API)
+EXT_KIND = {
+    ".jpg":  ("image", "image/jpeg"),
+    ".jpeg": ("image", "image/jpeg"),
+    ".png":  ("image", "image/png"),
+    ".webp": ("image", "image/webp"),
+    ".gif":  ("image", "image/gif"),
+    ".ogg":  ("audio", "audio/ogg"),
+    ".mp3":  ("audio", "audio/mpeg"),
+    ".wav":  ("audio", "audio/wav"),
+    ".m4a":  ("audio", "audio/mp4"),
+    ".opus": ("audio", "audio/ogg"),
+    ".mp4":  ("video", "video/mp4"),
+    ".mov":  ("video", "video/mp4"),
+    ".webm": ("video", "video/webm"),
+    ".mkv":  ("video", "video/x-matroska"),
+}
+
+
+# Messages that never need a round-trip to the API
+SAFE_SHORT  = frozenset({"ok", "lol", "gg", "ty", "np", "hi", "hello", "bye", "thanks", "yes", "no", "k", "kk"})
+_URL_RE     = re.compile(r"\s*https?://\S+\s*")
+_PUNCT_ONLY = re.compile(r"[\s!-/:-@\[-`{-~]*")   # ASCII punctuation; emoji still go to the API
+
+
+def is_trivial_text(content: str) -> bool:
+    text = content.strip()
+    return (
+        _PUNCT_ONLY.fullmatch(text) is not None
+        or text.lower().strip(".!?") in SAFE_SHORT
+        or _URL_RE.fullmatch(text) is not None
+    )
+
+
+def attachment_kind(attachment: discord.Attachment) -> tuple[str | None, str | None]:
+    found = EXT_KIND.get(os.path.splitext(attachment.filename)[1].lower())
+    if found:
+        return found
+    # Unknown extension — fall back to the content type Discord reports
+    ct = (attachment.content_type or "").lower()
+    kind = ct.partition("/")[0]
+    if kind in ATTACHMENT_LABELS:
+        return kind, ct.partition(";")[0]
+    return None, None
+
+
+async def analyze_attachment(
+    attachment: discord.Attachment,
+    kind: str,
+    mime: str,
+    caption: str | None,
+    prior: int,
+    sender_display: str,
+) -> dict | None:
+    if kind == "video":
+        # Pipe the CDN download straight into the upload instead of buffering it
+        try:
+            async with open_session().get(attachment.url) as src:
+                src.raise_for_status()
+                return await api_video(src.content, attachment.filename, caption, prior, sender_display, mime)
+        except Exception as e:
+            print(f"[ERROR] Could not stream attachment {attachment.filename}: {e}")
+            return None
+
+    try:
+        file_bytes = await attachment.read()
+    except Exception as e:
+        print(f"[ERROR] Could not read attachment {attachment.filename}: {e}")
+        return None
+
+    if kind == "image":
+        return await api_image(file_bytes, attachment.filename, caption, prior, sender_display, mime)
+    return await api_audio(file_bytes, attachment.filename, prior, sender_display, mime)
+
+
 @bot.event
 async def on_message(message: discord.Message):
     # Ignore DMs, bots, and system messages
     if not message.guild or message.author.bot or not message.author:
         return
 
-    await bot.process_commands(message)  # allow prefix commands to still work
+    # Prefix commands still work, but run alongside classification instead of before it
+    spawn(bot.process_commands(message))
+
+    has_text   = bool(message.content.strip())
+    has_attach = bool(message.attachments)
+    if not (has_text or has_attach):
+        return  # nothing to analyze — skip the settings/violations lookups
 
     guild_id       = message.guild.id
     sender_id      = str(message.author.id)
     sender_display = message.author.display_name
-    prior          = get_violations(guild_id, message.author.id)
-    settings       = get_settings(guild_id)
-
-    # ── Text ─────────────────────────────────────
-    if message.content.strip():
-        result = await api_text(message.content, sender_id, sender_display, prior, settings)
-        if result and is_bad_result(result):
-            await apply_verdict(message, result)
-            return  # stop processing attachments if text itself is already bad
-
-    # ── Attachments ──────────────────────────────
+    prior          = await get_violations(guild_id, message.author.id)
+    settings       = await get_settings(guild_id)
+
+    # Text + every attachment are analyzed concurrently; verdict priority stays
+    # text first, then attachments in order.
+    tasks: list[tuple[str, asyncio.Task]] = []
+    if has_text and not is_trivial_text(message.content):
+        tasks.append(("", asyncio.create_task(
+            api_text(message.content, sender_id, sender_display, prior, settings)
+        )))
     for attachment in message.attachments:
-        name = attachment.filename.lower()
-        ct   = (attachment.content_type or "").lower()
-
-        try:
-            file_bytes = await attachment.read()
-        except Exception as e:
-            print(f"[ERROR] Could not read attachment {name}: {e}")
+        kind, mime = attachment_kind(attachment)
+        if kind is None:
+            continue
+        if attachment.size > ATTACHMENT_MAX[kind]:
+            print(f"[SKIP] {kind.capitalize()} too large: {attachment.size} bytes")
             continue
+        tasks.append((ATTACHMENT_LABELS[kind], asyncio.create_task(
+            analyze_attachment(attachment, kind, mime, message.content or None, prior, sender_display)
+        )))
+
+    try:
+        for label, task in tasks:
+            try:
+                result = await task
+            except Exception as e:
+                print(f"[ERROR] Analysis failed: {e}")
+                continue
+            if result and is_bad_result(result):
+                # One verdict per message is enough — stop pending downloads
+                # before the Discord calls in apply_verdict
+                for _, other in tasks:
+                    other.cancel()
+                await apply_verdict(message, result, media_label=label)
+                break
+    finally:
+        for _, task in tasks:
+            task.cancel()
 
-        result = None
 
-        # Image
-        if ct.startswith("image/") or name.endswith((".jpg", ".jpeg", ".png", ".webp", ".gif")):
-            result = await api_image(file_bytes, attachment.filename, message.content or None, prior, sender_display)
-            label  = "🖼 Image"
+# ═══════════════════════════════════════════════
+# SLASH COMMANDS
+# ═══════════════════════════════════════════════
 
-        # Audio
-        elif ct.startswith("audio/") or name.endswith((".ogg", ".mp3", ".wav", ".m4a", ".opus")):
-            result = await api_audio(file_bytes, attachment.filename, prior, sender_display)
-            label  = "🎙 Audio"
+# /check is read-only, so a few minutes of staleness is harmless
+_CHECK_CACHE: dict[tuple[str, int], tuple[float, dict]] = {}
 
-        # Video
-        elif ct.startswith("video/") or name.endswith((".mp4", ".mov", ".webm", ".mkv")):
-            if attachment.size > 20 * 1024 * 1024:
-                print(f"[SKIP] Video too large: {attachment.size} bytes")
-                continue
-            result = await api_video(file_bytes, attachment.filename, message.content or None, prior, sender_display)
-            label  = "🎥 Video"
 
-        else:
-            continue
+def check_cache_get(key: tuple[str, int]) -> dict | None:
+    hit = _CHECK_CACHE.get(key)
+    if hit and time.monotonic() - hit[0] < CHECK_CACHE_TTL:
+        return hit[1]
+    return None
 
-        if result and is_bad_result(result):
-            await apply_verdict(message, result, media_label=label)
-            break  # one verdict per message is enough
 
+def check_cache_put(key: tuple[str, int], result: dict):
+    now = time.monotonic()
+    if len(_CHECK_CACHE) >= CHECK_CACHE_MAX:
+        for k in [k for k, (ts, _) in _CHECK_CACHE.items() if now - ts >= CHECK_CACHE_TTL]:
+            del _CHECK_CACHE[k]
+        if len(_CHECK_CACHE) >= CHECK_CACHE_MAX:
+            _CHECK_CACHE.pop(next(iter(_CHECK_CACHE)))   # oldest insertion
+    _CHECK_CACHE[key] = (now, result)
 
-# ═══════════════════════════════════════════════
-# SLASH COMMANDS
-# ═══════════════════════════════════════════════
 
 @bot.tree.command(name="check", description="Analyze text for harassment (no moderation applied)")
 @app_commands.describe(text="The message text to analyze")
@@ -455,9 +948,14 @@ async def slash_check(interaction: discord.Interaction, text: str):
     await interaction.response.defer(ephemeral=True)
 
     guild_id = interaction.guild_id
-    settings = get_settings(guild_id) if guild_id else dict(DEFAULT_SETTINGS)
+    settings = await get_settings(guild_id) if guild_id else dict(DEFAULT_SETTINGS)
 
-    result = await api_text(text, "check_user", "checked text", 0, settings)
+    key    = (text, hash(orjson.dumps(settings, option=orjson.OPT_SORT_KEYS)))
+    result = check_cache_get(key)
+    if result is None:
+        result = await api_text(text, "check_user", "checked text", 0, settings, verdict_only=False)
+        if result is not None:
+            check_cache_put(key, result)
     if result is None:
         await interaction.followup.send("❌ API error — could not analyze.", ephemeral=True)
         return
@@ -485,7 +983,7 @@ async def slash_check(interaction: discord.Interaction, text: str):
 @app_commands.describe(user="The user to look up")
 @app_commands.default_permissions(administrator=True)
 async def slash_violations(interaction: discord.Interaction, user: discord.Member):
-    count = get_violations(interaction.guild_id, user.id)
+    count = await get_violations(interaction.guild_id, user.id)
     embed = discord.Embed(
         title="📊 Violation Record",
         color=discord.Color.blurple(),
@@ -517,7 +1015,7 @@ async def slash_reset(interaction: discord.Interaction, user: discord.Member):
 @app_commands.default_permissions(administrator=True)
 async def slash_settings(interaction: discord.Interaction):
     await interaction.response.send_message(
-        embed=settings_embed(interaction.guild_id),
+        embed=await settings_embed(interaction.guild_id),
         view=SettingsView(interaction.guild_id),
         ephemeral=True,
     )
@@ -530,8 +1028,8 @@ async def slash_settings(interaction: discord.Interaction):
 ALL_CATEGORIES = ["sexual", "verbal_abuse", "harassment", "gasslighting", "threat", "stalking", "other"]
 
 
-def settings_embed(guild_id: int) -> discord.Embed:
-    s  = get_settings(guild_id)
+async def settings_embed(guild_id: int) -> discord.Embed:
+    s  = await get_settings(guild_id)
     aw = "✅" if s["auto_warn"]  else "❌"
     ab = "✅" if s["auto_block"] else "❌"
     imute  = ", ".join(s["instant_mute_categories"])  or "none"
@@ -559,94 +1057,98 @@ class SettingsView(discord.ui.View):
 
     @discord.ui.button(label="Toggle Auto-warn", style=discord.ButtonStyle.secondary, row=3)
     async def toggle_warn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s = get_settings(self.guild_id)
+        s = await get_settings(self.guild_id)
         s["auto_warn"] = not s["auto_warn"]
         save_settings(self.guild_id, s)
-        await interaction.response.edit_message(embed=settings_embed(self.guild_id), view=self)
+        await interaction.response.edit_message(embed=await settings_embed(self.guild_id), view=self)
 
     @discord.ui.button(label="Toggle Auto-ban", style=discord.ButtonStyle.secondary, row=3)
     async def toggle_ban(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s = get_settings(self.guild_id)
+        s = await get_settings(self.guild_id)
         s["auto_block"] = not s["auto_block"]
         save_settings(self.guild_id, s)
-        await interaction.response.edit_message(embed=settings_embed(self.guild_id), view=self)
+        await interaction.response.edit_message(embed=await settings_embed(self.guild_id), view=self)
 
     @discord.ui.button(label="⚡ Instant mute cats", style=discord.ButtonStyle.primary, row=4)
     async def instant_mute_cats(self, interaction: discord.Interaction, button: discord.ui.Button):
+        s = await get_settings(self.guild_id)
         await interaction.response.send_message(
             "Select categories for **instant mute**:",
-            view=CategoryToggleView(self.guild_id, "instant_mute_categories"),
+            view=CategoryToggleView(self.guild_id, "instant_mute_categories", s["instant_mute_categories"]),
             ephemeral=True,
         )
 
     @discord.ui.button(label="💥 Instant ban cats", style=discord.ButtonStyle.danger, row=4)
     async def instant_ban_cats(self, interaction: discord.Interaction, button: discord.ui.Button):
+        s = await get_settings(self.guild_id)
         await interaction.response.send_message(
             "Select categories for **instant ban**:",
-            view=CategoryToggleView(self.guild_id, "instant_block_categories"),
+            view=CategoryToggleView(self.guild_id, "instant_block_categories", s["instant_block_categories"]),
             ephemeral=True,
         )
 
 
 class ConfidenceSelect(discord.ui.Select):
+    _OPTS = [
+        discord.SelectOption(label=f"Confidence threshold: {v}", value=str(v))
+        for v in [0.40, 0.50, 0.55, 0.60, 0.65, 0.70, 0.75, 0.80, 0.85, 0.90]
+    ]
+
     def __init__(self, guild_id: int):
         self.guild_id = guild_id
-        options = [
-            discord.SelectOption(label=f"Confidence threshold: {v}", value=str(v))
-            for v in [0.40, 0.50, 0.55, 0.60, 0.65, 0.70, 0.75, 0.80, 0.85, 0.90]
-        ]
-        super().__init__(placeholder="🎯 Set confidence threshold", options=options, row=0)
+        super().__init__(placeholder="🎯 Set confidence threshold", options=list(self._OPTS), row=0)
 
     async def callback(self, interaction: discord.Interaction):
-        s = get_settings(self.guild_id)
+        s = await get_settings(self.guild_id)
         s["min_confidence_for_action"] = float(self.values[0])
         save_settings(self.guild_id, s)
-        await interaction.response.edit_message(embed=settings_embed(self.guild_id), view=self.view)
+        await interaction.response.edit_message(embed=await settings_embed(self.guild_id), view=self.view)
 
 
 class MuteThreshSelect(discord.ui.Select):
+    _OPTS = [
+        discord.SelectOption(label=f"Mute after {v} violations", value=str(v))
+        for v in range(1, 11)
+    ]
+
     def __init__(self, guild_id: int):
         self.guild_id = guild_id
-        options = [
-            discord.SelectOption(label=f"Mute after {v} violations", value=str(v))
-            for v in range(1, 11)
-        ]
-        super().__init__(placeholder="📈 Mute threshold", options=options, row=1)
+        super().__init__(placeholder="📈 Mute threshold", options=list(self._OPTS), row=1)
 
     async def callback(self, interaction: discord.Interaction):
-        s = get_settings(self.guild_id)
+        s = await get_settings(self.guild_id)
         s["mute_threshold_violations"] = int(self.values[0])
         save_settings(self.guild_id, s)
-        await interaction.response.edit_message(embed=settings_embed(self.guild_id), view=self.view)
+        await interaction.response.edit_message(embed=await settings_embed(self.guild_id), view=self.view)
 
 
 class BanThreshSelect(discord.ui.Select):
+    _OPTS = [
+        discord.SelectOption(label=f"Ban after {v} violations", value=str(v))
+        for v in range(1, 11)
+    ]
+
     def __init__(self, guild_id: int):
         self.guild_id = guild_id
-        options = [
-            discord.SelectOption(label=f"Ban after {v} violations", value=str(v))
-            for v in range(1, 11)
-        ]
-        super().__init__(placeholder="🚫 Ban threshold", options=options, row=2)
+        super().__init__(placeholder="🚫 Ban threshold", options=list(self._OPTS), row=2)
 
     async def callback(self, interaction: discord.Interaction):
-        s = get_settings(self.guild_id)
+        s = await get_settings(self.guild_id)
         s["block_threshold_violations"] = int(self.values[0])
         save_settings(self.guild_id, s)
-        await interaction.response.edit_message(embed=settings_embed(self.guild_id), view=self.view)
+        await interaction.response.edit_message(embed=await settings_embed(self.guild_id), view=self.view)
 
 
 class CategoryToggleView(discord.ui.View):
-    def __init__(self, guild_id: int, key: str):
+    def __init__(self, guild_id: int, key: str, current: list[str]):
         super().__init__(timeout=120)
-        self.add_item(CategorySelect(guild_id, key))
+        self.add_item(CategorySelect(guild_id, key, current))
 
 
 class CategorySelect(discord.ui.Select):
-    def __init__(self, guild_id: int, key: str):
+    def __init__(self, guild_id: int, key: str, current: list[str]):
         self.guild_id = guild_id
         self.key      = key
-        current = get_settings(guild_id)[key]
         options = [
             discord.SelectOption(label=cat, value=cat, default=(cat in current))
             for cat in ALL_CATEGORIES
@@ -659,7 +1161,7 @@ class CategorySelect(discord.ui.Select):
         )
 
     async def callback(self, interaction: discord.Interaction):
-        s = get_settings(self.guild_id)
+        s = await get_settings(self.guild_id)
         s[self.key] = self.values
         save_settings(self.guild_id, s)
         await interaction.response.send_message(
@@ -675,6 +1177,10 @@ class CategorySelect(discord.ui.Select):
 @bot.event
 async def on_ready():
     init_db()
+    open_session()
+    start_flush_loop()
+    for guild in bot.guilds:
+        find_log_channel(guild)
     await bot.tree.sync()
     print(f"✅ Mokosh is online as {bot.user} — slash commands synced")
     print(f"   Monitoring {len(bot.guilds)} server(s)")
@@ -712,4 +1218,10 @@ async def on_guild_join(guild: discord.Guild):
 
 
 if __name__ == "__main__":
+    if sys.platform != "win32":
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
     bot.run(DISCORD_TOKEN)
\ No newline at end of file
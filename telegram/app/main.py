@@ -19,18 +19,28 @@ Storage: SQLite (mokosh.db)
 """
 
 import io
-import json
+import re
+import copy
+import functools
+import orjson
+import asyncio
+import threading
 import sqlite3
 import httpx
 import os
+import logging
 from contextlib import contextmanager
+from typing import BinaryIO
+from cachetools import TTLCache
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    AIORateLimiter,
     ApplicationBuilder,
     MessageHandler,
     CommandHandler,
     CallbackQueryHandler,
+    ChatMemberHandler,
     filters,
     ContextTypes,
 )
@@ -44,6 +54,8 @@ BOT_USERNAME   = os.getenv("BOT_USERNAME", "your_bot")
 API_TOKEN      = os.getenv("API_TOKEN")       # optional X-API-Token header
 DB_PATH        = os.getenv("DB_PATH", "mokosh.db")
 
+LOG = logging.getLogger("mokosh")
+
 
 def api_headers() -> dict:
     h = {}
@@ -52,12 +64,53 @@ def api_headers() -> dict:
     return h
 
 
+# Long-lived pooled clients, opened in post_init and closed in post_shutdown.
+# Text moderation and media uploads get separate pools so a slow 20MB upload
+# never holds up short /analyze/messages calls.
+HTTP: httpx.AsyncClient | None = None
+HTTP_MEDIA: httpx.AsyncClient | None = None
+
+
+async def open_http_clients(application):
+    global HTTP, HTTP_MEDIA
+    HTTP = httpx.AsyncClient(
+        http2=True,
+        base_url=API_URL,
+        headers=api_headers(),
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=20.0,
+    )
+    HTTP_MEDIA = httpx.AsyncClient(
+        http2=True,
+        base_url=API_URL,
+        headers=api_headers(),
+        limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+        timeout=60.0,
+    )
+
+
+async def close_http_clients(application):
+    for client in (HTTP, HTTP_MEDIA):
+        if client is not None:
+            await client.aclose()
+
+
 # ═══════════════════════════════════════════════
 # DATABASE
 # ═══════════════════════════════════════════════
 
+# One process-wide connection in autocommit mode; DB_LOCK serializes access
+DB      = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+DB.row_factory = sqlite3.Row
+DB_LOCK = threading.Lock()
+
+
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
+    with get_conn() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
         conn.execute("""
             CREATE TABLE IF NOT EXISTS chat_settings (
                 chat_id  INTEGER PRIMARY KEY,
@@ -72,18 +125,13 @@ def init_db():
                 PRIMARY KEY (chat_id, user_id)
             )
         """)
-        conn.commit()
 
 
 @contextmanager
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    finally:
-        conn.close()
+    """Autocommit connection: each statement commits itself, so nothing to do on exit."""
+    with DB_LOCK:
+        yield DB
 
 
 DEFAULT_SETTINGS = {
@@ -101,69 +149,192 @@ DEFAULT_SETTINGS = {
 }
 
 
-def get_settings(chat_id: int) -> dict:
+# Settings change only through save_settings, so this cache never goes stale
+_SETTINGS_CACHE: dict[int, dict] = {}
+
+
+def _get_settings_sync(chat_id: int) -> dict:
     with get_conn() as conn:
         row = conn.execute(
             "SELECT settings FROM chat_settings WHERE chat_id = ?", (chat_id,)
         ).fetchone()
     if row:
-        return {**DEFAULT_SETTINGS, **json.loads(row["settings"])}
-    return dict(DEFAULT_SETTINGS)
+        settings = {**DEFAULT_SETTINGS, **orjson.loads(row["settings"])}
+    else:
+        settings = copy.deepcopy(DEFAULT_SETTINGS)
+    # setdefault: a save_settings() that raced this read must win
+    return _SETTINGS_CACHE.setdefault(chat_id, settings)
 
 
-def save_settings(chat_id: int, settings: dict):
+def _save_settings_sync(chat_id: int, settings: dict):
     with get_conn() as conn:
         conn.execute(
             """INSERT INTO chat_settings (chat_id, settings) VALUES (?, ?)
                ON CONFLICT(chat_id) DO UPDATE SET settings = excluded.settings""",
-            (chat_id, json.dumps(settings)),
+            (chat_id, orjson.dumps(settings).decode()),
         )
+    _SETTINGS_CACHE[chat_id] = copy.deepcopy(settings)
+
 
+# Mirrors the violations table; kept current by _incr_violations_sync
+_VIOLATIONS_CACHE: dict[tuple[int, int], int] = {}
 
-def get_violations(chat_id: int, user_id: int) -> int:
+
+def _get_violations_sync(chat_id: int, user_id: int) -> int:
     with get_conn() as conn:
         row = conn.execute(
             "SELECT count FROM violations WHERE chat_id = ? AND user_id = ?",
             (chat_id, user_id),
         ).fetchone()
-    return row["count"] if row else 0
+    return _VIOLATIONS_CACHE.setdefault((chat_id, user_id), row["count"] if row else 0)
 
 
-def set_violations(chat_id: int, user_id: int, count: int):
+def _incr_violations_sync(chat_id: int, user_id: int) -> int:
+    """Atomically add one violation and return the new total."""
     with get_conn() as conn:
-        conn.execute(
-            """INSERT INTO violations (chat_id, user_id, count) VALUES (?, ?, ?)
-               ON CONFLICT(chat_id, user_id) DO UPDATE SET count = excluded.count""",
-            (chat_id, user_id, count),
-        )
+        count = conn.execute(
+            """INSERT INTO violations (chat_id, user_id, count) VALUES (?, ?, 1)
+               ON CONFLICT(chat_id, user_id) DO UPDATE SET count = count + 1
+               RETURNING count""",
+            (chat_id, user_id),
+        ).fetchone()[0]
+    _VIOLATIONS_CACHE[(chat_id, user_id)] = count
+    return count
+
+
+# Async wrappers — DB work runs on a worker thread so it never blocks the loop
+async def get_settings(chat_id: int) -> dict:
+    """Returns a private copy — callers edit it in place before save_settings."""
+    cached = _SETTINGS_CACHE.get(chat_id)
+    if cached is None:
+        cached = await asyncio.to_thread(_get_settings_sync, chat_id)
+    return copy.deepcopy(cached)
+
+
+async def save_settings(chat_id: int, settings: dict):
+    # The cache mirrors the DB, so an unchanged dict needs no write
+    if _SETTINGS_CACHE.get(chat_id) == settings:
+        return
+    await asyncio.to_thread(_save_settings_sync, chat_id, settings)
+
+
+async def get_violations(chat_id: int, user_id: int) -> int:
+    cached = _VIOLATIONS_CACHE.get((chat_id, user_id))
+    if cached is not None:
+        return cached
+    return await asyncio.to_thread(_get_violations_sync, chat_id, user_id)
+
+
+async def incr_violations(chat_id: int, user_id: int) -> int:
+    return await asyncio.to_thread(_incr_violations_sync, chat_id, user_id)
 
 
 # ═══════════════════════════════════════════════
 # HELPERS
 # ═══════════════════════════════════════════════
 
+_MD2_TABLE = str.maketrans({ch: f"\\{ch}" for ch in r"\_*[]()~`>#+-=|{}.!"})
+
+
 def esc(text: str) -> str:
     """Escape text for Telegram MarkdownV2."""
-    for ch in r"\_*[]()~`>#+-=|{}.!":
-        text = text.replace(ch, f"\\{ch}")
-    return text
+    return text.translate(_MD2_TABLE)
+
+
+# (chat_id, user_id) → is admin; dropped early by on_chat_member_update
+_ADMIN_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+
+async def check_admin(bot, chat_id: int, user_id: int) -> bool:
+    """Cached admin lookup. Errors propagate and are not cached."""
+    key = (chat_id, user_id)
+    cached = _ADMIN_CACHE.get(key)
+    if cached is None:
+        member = await bot.get_chat_member(chat_id, user_id)
+        cached = _ADMIN_CACHE[key] = member.status in ("administrator", "creator")
+    return cached
 
 
 async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     try:
-        member = await context.bot.get_chat_member(
-            update.effective_chat.id, update.effective_user.id
-        )
-        return member.status in ("administrator", "creator")
+        return await check_admin(context.bot, update.effective_chat.id, update.effective_user.id)
     except Exception:
         return False
 
 
-async def download_file(bot, file_id: str) -> bytes:
+async def on_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Promotions/demotions take effect immediately instead of after the cache TTL."""
+    change = update.chat_member
+    _ADMIN_CACHE.pop((change.chat.id, change.new_chat_member.user.id), None)
+
+
+# Caps how many media files are downloaded/uploaded at once (and so peak memory)
+MEDIA_SEM = asyncio.Semaphore(int(os.getenv("MEDIA_CONCURRENCY", "8")))
+
+
+async def download_file(bot, file_id: str, out: BinaryIO) -> BinaryIO:
+    """Download into `out` and rewind it, ready to be passed to the API.
+
+    `out` should be a BytesIO: PTB buffers the whole file anyway, and httpx
+    sizes a BytesIO with tell/seek, whereas a file-backed object gets fileno()'d.
+    """
     tg_file = await bot.get_file(file_id)
-    buf = io.BytesIO()
-    await tg_file.download_to_memory(buf)
-    return buf.getvalue()
+    await tg_file.download_to_memory(out)
+    out.seek(0)
+    return out
+
+
+SAFE_SHORT  = frozenset({"ok", "lol", "gg", "ty", "np", "hi", "hello", "bye", "thanks", "yes", "no", "k", "kk"})
+_URL_RE     = re.compile(r"https?://\S+")
+_TRIVIAL_RE = re.compile(r"\W*")   # short words like "kys" must still reach the API
+
+
+def is_trivial_text(text: str) -> bool:
+    """Commands, bare URLs, emoji/punctuation-only text and SAFE_SHORT replies."""
+    if text.startswith("/"):
+        return True
+    rest = _URL_RE.sub("", text).strip()
+    return _TRIVIAL_RE.fullmatch(rest) is not None or rest.lower().strip(".!?") in SAFE_SHORT
+
+
+def sniff(file: BinaryIO, n: int = 12) -> bytes:
+    """Peek at the first bytes of a downloaded file without consuming it."""
+    head = file.read(n)
+    file.seek(0)
+    return head
+
+
+def looks_like_image(head: bytes) -> bool:
+    return (
+        head.startswith((b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF8"))
+        or (head[:4] == b"RIFF" and head[8:12] == b"WEBP")
+    )
+
+
+# Top-level ISO BMFF / QuickTime atoms; older .mov files often start without "ftyp"
+_BMFF_ATOMS = frozenset({b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"})
+
+
+def looks_like_video(head: bytes) -> bool:
+    # Atom type sits at offset 4; Matroska/WebM starts with EBML;
+    # animations can also arrive as real GIFs
+    return head[4:8] in _BMFF_ATOMS or head.startswith((b"\x1a\x45\xdf\xa3", b"GIF8"))
+
+
+# Verdicts for media already analyzed, keyed by (file_unique_id, caption).
+# file_unique_id is stable across chats and re-sends, so reposts skip both
+# the Telegram download and the analysis upload.
+_MEDIA_VERDICT: TTLCache = TTLCache(maxsize=4096, ttl=600)
+
+# Notes the API wrote to the original sender; a repost by anyone else
+# gets the default warning instead.
+_SENDER_FIELDS = ("sender_response", "response")
+
+
+def remember_media_verdict(key: tuple[str, str | None], result: dict | None):
+    """`result` is None for failed or non-200 calls, which are not cached."""
+    if result is not None:
+        _MEDIA_VERDICT[key] = {k: v for k, v in result.items() if k not in _SENDER_FIELDS}
 
 
 def is_bad_result(result: dict) -> bool:
@@ -181,105 +352,109 @@ async def api_text(
     settings: dict,
 ) -> dict | None:
     """POST /analyze/messages"""
-    async with httpx.AsyncClient() as client:
-        try:
-            r = await client.post(
-                f"{API_URL}/analyze/messages",
-                headers=api_headers(),
-                json={
-                    "messages": [{
-                        "sender_id":        sender_id,
-                        "sender_display":   sender_display,
-                        "text":             text,
-                        "prior_violations": prior,
-                    }],
-                    "settings": settings,
-                },
-                timeout=20.0,
-            )
-            data = r.json()
-            print(f"[DEBUG] /analyze/messages raw: {r.status_code} {data}")
-            # Handle both {"results": [...]} and direct object
-            if isinstance(data, dict) and "results" in data:
-                return data["results"][0]
-            return data
-        except Exception as e:
-            print(f"[ERROR] /analyze/messages failed: {e}")
-            return None
+    try:
+        r = await HTTP.post(
+            "/analyze/messages",
+            json={
+                "messages": [{
+                    "sender_id":        sender_id,
+                    "sender_display":   sender_display,
+                    "text":             text,
+                    "prior_violations": prior,
+                }],
+                "settings": settings,
+            },
+            timeout=20.0,
+        )
+        data = r.json()
+        LOG.debug("/analyze/messages raw: %s %s", r.status_code, data)
+        # Handle both {"results": [...]} and direct object
+        if isinstance(data, dict) and "results" in data:
+            return data["results"][0]
+        return data
+    except Exception:
+        LOG.exception("/analyze/messages failed")
+        return None
 
 
 async def api_image(
-    file_bytes: bytes,
+    file: BinaryIO,
     filename: str,
     caption: str | None,
     prior: int,
     sender_label: str,
 ) -> dict | None:
     """POST /analyze/image  (multipart)"""
-    async with httpx.AsyncClient() as client:
-        try:
-            data = {"prior_violations": str(prior), "sender_label": sender_label}
-            if caption:
-                data["caption"] = caption
-            r = await client.post(
-                f"{API_URL}/analyze/image",
-                headers=api_headers(),
-                data=data,
-                files={"file": (filename, file_bytes, "image/jpeg")},
-                timeout=30.0,
-            )
-            return r.json()
-        except Exception as e:
-            print(f"[ERROR] /analyze/image failed: {e}")
+    try:
+        data = {"prior_violations": str(prior), "sender_label": sender_label}
+        if caption:
+            data["caption"] = caption
+        r = await HTTP_MEDIA.post(
+            "/analyze/image",
+            data=data,
+            files={"file": (filename, file, "image/jpeg")},
+            timeout=30.0,
+        )
+        # Error payloads must not reach the verdict cache
+        if r.status_code != 200:
+            LOG.warning("/analyze/image returned HTTP %d", r.status_code)
             return None
+        return r.json()
+    except Exception:
+        LOG.exception("/analyze/image failed")
+        return None
 
 
 async def api_audio(
-    file_bytes: bytes,
+    file: BinaryIO,
     filename: str,
     prior: int,
     sender_label: str,
 ) -> dict | None:
     """POST /analyze/audio  (multipart)"""
-    async with httpx.AsyncClient() as client:
-        try:
-            r = await client.post(
-                f"{API_URL}/analyze/audio",
-                headers=api_headers(),
-                data={"prior_violations": str(prior), "sender_label": sender_label},
-                files={"file": (filename, file_bytes, "audio/ogg")},
-                timeout=40.0,
-            )
-            return r.json()
-        except Exception as e:
-            print(f"[ERROR] /analyze/audio failed: {e}")
+    try:
+        r = await HTTP_MEDIA.post(
+            "/analyze/audio",
+            data={"prior_violations": str(prior), "sender_label": sender_label},
+            files={"file": (filename, file, "audio/ogg")},
+            timeout=40.0,
+        )
+        # Error payloads must not reach the verdict cache
+        if r.status_code != 200:
+            LOG.warning("/analyze/audio returned HTTP %d", r.status_code)
             return None
+        return r.json()
+    except Exception:
+        LOG.exception("/analyze/audio failed")
+        return None
 
 
 async def api_video(
-    file_bytes: bytes,
+    file: BinaryIO,
     filename: str,
     caption: str | None,
     prior: int,
     sender_label: str,
 ) -> dict | None:
     """POST /analyze/video  (multipart)"""
-    async with httpx.AsyncClient() as client:
-        try:
-            data = {"prior_violations": str(prior), "sender_label": sender_label}
-            if caption:
-                data["caption"] = caption
-            r = await client.post(
-                f"{API_URL}/analyze/video",
-                headers=api_headers(),
-                data=data,
-                files={"file": (filename, file_bytes, "video/mp4")},
-                timeout=60.0,
-            )
-            return r.json()
-        except Exception as e:
-            print(f"[ERROR] /analyze/video failed: {e}")
+    try:
+        data = {"prior_violations": str(prior), "sender_label": sender_label}
+        if caption:
+            data["caption"] = caption
+        r = await HTTP_MEDIA.post(
+            "/analyze/video",
+            data=data,
+            files={"file": (filename, file, "video/mp4")},
+            timeout=60.0,
+        )
+        # Error payloads must not reach the verdict cache
+        if r.status_code != 200:
+            LOG.warning("/analyze/video returned HTTP %d", r.status_code)
             return None
+        return r.json()
+    except Exception:
+        LOG.exception("/analyze/video failed")
+        return None
 
 
 # ─── Verdict renderer & enforcer ────────────────
@@ -291,6 +466,16 @@ async def api_video(
 BAN_VIOLATION_THRESHOLD = 2
 BAN_CONFIDENCE_THRESHOLD = 0.80
 
+# MarkdownV2 reply templates; static parts are escaped here, once
+_VERDICT_TEMPLATE = "{emoji} *Violation detected*\n{label}Category: `{cats}`\nConfidence: `{conf:.0%}`\n\n{note}"
+_BAN_NOTE  = "🚫 *@{sender} has been banned*\nReason: {count} violations, confidence {conf:.0%}"
+_WARN_NOTE = (
+    "⚠️ @{sender}, {verdict}\n\n"
+    "_Violation {count} recorded\\. "
+    f"Ban triggers at {BAN_VIOLATION_THRESHOLD}\\+ violations with {int(BAN_CONFIDENCE_THRESHOLD*100)}\\%\\+ confidence\\._"
+)
+_DEFAULT_WARN_VERDICT = esc("please do not write like this.")
+
 
 async def apply_verdict(
     update: Update,
@@ -308,58 +493,51 @@ async def apply_verdict(
         categories = ", ".join(categories)
     confidence  = result.get("confidence", 0.0)
     api_verdict = result.get("sender_response") or result.get("response", "")
-    label_line  = f"Content: `{esc(media_label)}`\n" if media_label else ""
 
-    # Read current violations BEFORE incrementing
-    prior = get_violations(chat_id, sender_id)
-    new_count = prior + 1
-    set_violations(chat_id, sender_id, new_count)
+    # Increment and read back in one statement
+    new_count = await incr_violations(chat_id, sender_id)
 
     # Decide action purely on our own rules
     should_ban = (new_count >= BAN_VIOLATION_THRESHOLD and confidence >= BAN_CONFIDENCE_THRESHOLD)
 
+    action_text = "banned" if should_ban else "warned"
+    LOG.warning("moderation: %s | violations=%d conf=%.0f%% → %s", sender_display, new_count, confidence * 100, action_text)
+
+    sender = esc(sender_display)
     if should_ban:
-        action_emoji = "🚫"
-        action_text  = "banned"
-        action_note  = (
-            f"🚫 *@{esc(sender_display)} has been banned*\n"
-            f"Reason: {new_count} violations, confidence {confidence:.0%}"
-        )
+        note = _BAN_NOTE.format(sender=sender, count=new_count, conf=confidence)
     else:
-        action_emoji = "⚠️"
-        action_text  = "warned"
-        action_note  = (
-            f"⚠️ @{esc(sender_display)}, "
-            f"{esc(api_verdict) if api_verdict else 'please do not write like this.'}\n\n"
-            f"_Violation {new_count} recorded\\. "
-            f"Ban triggers at {BAN_VIOLATION_THRESHOLD}\\+ violations with {int(BAN_CONFIDENCE_THRESHOLD*100)}\\%\\+ confidence\\._"
-        )
-
-    print(f"[MODERATION] {sender_display} | violations={new_count} conf={confidence:.0%} → {action_text}")
+        verdict = esc(api_verdict) if api_verdict else _DEFAULT_WARN_VERDICT
+        note    = _WARN_NOTE.format(sender=sender, verdict=verdict, count=new_count)
 
     try:
         await message.reply_text(
-            f"{action_emoji} *Violation detected*\n"
-            f"{label_line}"
-            f"Category: `{esc(categories)}`\n"
-            f"Confidence: `{confidence:.0%}`\n\n"
-            f"{action_note}",
+            _VERDICT_TEMPLATE.format(
+                emoji="🚫" if should_ban else "⚠️",
+                label=f"Content: `{esc(media_label)}`\n" if media_label else "",
+                cats=esc(categories),
+                conf=confidence,
+                note=note,
+            ),
             parse_mode="MarkdownV2",
         )
-    except Exception as e:
-        print(f"[ERROR] reply_text failed: {e}")
+    except Exception:
+        LOG.exception("reply_text failed")
         return
 
     if should_ban:
-        try:
-            await message.delete()
-        except Exception as e:
-            print(f"[WARN] delete failed: {e}")
-        try:
-            await context.bot.ban_chat_member(chat_id=chat_id, user_id=sender_id)
-            print(f"[BAN] {sender_display} ({sender_id}) banned from {chat_id}")
-        except Exception as e:
-            print(f"[WARN] ban failed: {e}")
+        # Independent Bot API calls — run them concurrently
+        deleted, banned = await asyncio.gather(
+            message.delete(),
+            context.bot.ban_chat_member(chat_id=chat_id, user_id=sender_id),
+            return_exceptions=True,
+        )
+        if isinstance(deleted, Exception):
+            LOG.warning("delete failed: %s", deleted)
+        if isinstance(banned, Exception):
+            LOG.warning("ban failed: %s", banned)
+        else:
+            LOG.warning("ban: %s (%s) banned from %s", sender_display, sender_id, chat_id)
 
 
 # ═══════════════════════════════════════════════
@@ -368,67 +546,81 @@ async def apply_verdict(
 
 ALL_CATEGORIES = ["sexual", "verbal_abuse", "harassment", "gasslighting", "threat", "stalking", "other"]
 
+# Fixed MarkdownV2 labels, escaped once at import; only values are filled in
+SETTINGS_TEXT = (
+    "⚙️ *Mokosh Settings*\n\n"
+    "🎯 Confidence threshold: `{min_confidence_for_action}`\n"
+    "⏱ Mute duration: `{mute_minutes} min`\n"
+    "📈 Mute after violations: `{mute_threshold_violations}`\n"
+    "🚫 Ban after violations: `{block_threshold_violations}`\n"
+    "⚠️ Auto\\-warn: {aw}\n"
+    "🔇 Auto\\-mute: {am}\n"
+    "🚫 Auto\\-ban: {ab}\n"
+    "⚡ Instant mute: `{imute}`\n"
+    "💥 Instant ban: `{iblock}`"
+)
+CATEGORY_TITLE_MUTE  = f"⚡ *{esc('Instant Mute')} Categories*\nTap to toggle:"
+CATEGORY_TITLE_BLOCK = f"⚡ *{esc('Instant Ban')} Categories*\nTap to toggle:"
 
-def settings_menu(chat_id: int) -> tuple[str, InlineKeyboardMarkup]:
-    s  = get_settings(chat_id)
+
+async def settings_menu(chat_id: int) -> tuple[str, InlineKeyboardMarkup]:
+    s  = await get_settings(chat_id)
     aw = "✅" if s["auto_warn"]  else "❌"
     am = "✅" if s["auto_mute"]  else "❌"
     ab = "✅" if s["auto_block"] else "❌"
     imute  = esc(", ".join(s["instant_mute_categories"])  or "none")
     iblock = esc(", ".join(s["instant_block_categories"]) or "none")
 
-    text = (
-        "⚙️ *Mokosh Settings*\n\n"
-        f"🎯 Confidence threshold: `{s['min_confidence_for_action']}`\n"
-        f"⏱ Mute duration: `{s['mute_minutes']} min`\n"
-        f"📈 Mute after violations: `{s['mute_threshold_violations']}`\n"
-        f"🚫 Ban after violations: `{s['block_threshold_violations']}`\n"
-        f"⚠️ Auto\\-warn: {aw}\n"
-        f"🔇 Auto\\-mute: {am}\n"
-        f"🚫 Auto\\-ban: {ab}\n"
-        f"⚡ Instant mute: `{imute}`\n"
-        f"💥 Instant ban: `{iblock}`"
-    )
-    keyboard = InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton(f"⚠️ Auto-warn {aw}",  callback_data=f"stg|{chat_id}|toggle|auto_warn"),
-            InlineKeyboardButton(f"🔇 Auto-mute {am}",  callback_data=f"stg|{chat_id}|toggle|auto_mute"),
-            InlineKeyboardButton(f"🚫 Auto-ban {ab}",   callback_data=f"stg|{chat_id}|toggle|auto_block"),
-        ],
-        [
-            InlineKeyboardButton("🎯 −",  callback_data=f"stg|{chat_id}|conf|-"),
-            InlineKeyboardButton(f"Conf {s['min_confidence_for_action']}", callback_data="noop"),
-            InlineKeyboardButton("🎯 +",  callback_data=f"stg|{chat_id}|conf|+"),
-        ],
-        [
-            InlineKeyboardButton("⏱ −15m", callback_data=f"stg|{chat_id}|mute|-"),
-            InlineKeyboardButton(f"Mute {s['mute_minutes']}m", callback_data="noop"),
-            InlineKeyboardButton("⏱ +15m", callback_data=f"stg|{chat_id}|mute|+"),
-        ],
-        [
-            InlineKeyboardButton("📈 Mute thresh −", callback_data=f"stg|{chat_id}|muteth|-"),
-            InlineKeyboardButton(f"mute@{s['mute_threshold_violations']}", callback_data="noop"),
-            InlineKeyboardButton("📈 Mute thresh +", callback_data=f"stg|{chat_id}|muteth|+"),
-        ],
-        [
-            InlineKeyboardButton("📈 Ban thresh −",  callback_data=f"stg|{chat_id}|banth|-"),
-            InlineKeyboardButton(f"ban@{s['block_threshold_violations']}", callback_data="noop"),
-            InlineKeyboardButton("📈 Ban thresh +",  callback_data=f"stg|{chat_id}|banth|+"),
-        ],
-        [
-            InlineKeyboardButton("⚡ Instant mute cats",  callback_data=f"stg|{chat_id}|cats|mute"),
-            InlineKeyboardButton("💥 Instant ban cats",   callback_data=f"stg|{chat_id}|cats|block"),
-        ],
-        [InlineKeyboardButton("✅ Done", callback_data=f"stg|{chat_id}|close|")],
+    text = SETTINGS_TEXT.format_map({**s, "aw": aw, "am": am, "ab": ab, "imute": imute, "iblock": iblock})
+    return text, _build_settings_keyboard(chat_id, s)
+
+
+_TOGGLE_LABELS = {"auto_warn": "⚠️ Auto-warn", "auto_mute": "🔇 Auto-mute", "auto_block": "🚫 Auto-ban"}
+
+
+@functools.lru_cache(maxsize=1024)
+def _settings_buttons(chat_id: int) -> dict:
+    """Buttons whose label and callback_data depend only on the chat."""
+    cb = f"stg|{chat_id}|"
+    buttons = {
+        "conf-":   InlineKeyboardButton("🎯 −",            callback_data=cb + "conf|-"),
+        "conf+":   InlineKeyboardButton("🎯 +",            callback_data=cb + "conf|+"),
+        "mute-":   InlineKeyboardButton("⏱ −15m",          callback_data=cb + "mute|-"),
+        "mute+":   InlineKeyboardButton("⏱ +15m",          callback_data=cb + "mute|+"),
+        "muteth-": InlineKeyboardButton("📈 Mute thresh −", callback_data=cb + "muteth|-"),
+        "muteth+": InlineKeyboardButton("📈 Mute thresh +", callback_data=cb + "muteth|+"),
+        "banth-":  InlineKeyboardButton("📈 Ban thresh −",  callback_data=cb + "banth|-"),
+        "banth+":  InlineKeyboardButton("📈 Ban thresh +",  callback_data=cb + "banth|+"),
+        "cats_m":  InlineKeyboardButton("⚡ Instant mute cats", callback_data=cb + "cats|mute"),
+        "cats_b":  InlineKeyboardButton("💥 Instant ban cats",  callback_data=cb + "cats|block"),
+        "close":   InlineKeyboardButton("✅ Done",          callback_data=cb + "close|"),
+    }
+    # Toggle buttons only ever show one of two labels — build both up front
+    for key, label in _TOGGLE_LABELS.items():
+        for on in (True, False):
+            buttons[key, on] = InlineKeyboardButton(
+                f"{label} {'✅' if on else '❌'}", callback_data=f"{cb}toggle|{key}"
+            )
+    return buttons
+
+
+def _build_settings_keyboard(chat_id: int, s: dict) -> InlineKeyboardMarkup:
+    b = _settings_buttons(chat_id)
+    return InlineKeyboardMarkup([
+        [b["auto_warn", bool(s["auto_warn"])], b["auto_mute", bool(s["auto_mute"])], b["auto_block", bool(s["auto_block"])]],
+        [b["conf-"],   InlineKeyboardButton(f"Conf {s['min_confidence_for_action']}", callback_data="noop"),   b["conf+"]],
+        [b["mute-"],   InlineKeyboardButton(f"Mute {s['mute_minutes']}m", callback_data="noop"),               b["mute+"]],
+        [b["muteth-"], InlineKeyboardButton(f"mute@{s['mute_threshold_violations']}", callback_data="noop"),   b["muteth+"]],
+        [b["banth-"],  InlineKeyboardButton(f"ban@{s['block_threshold_violations']}", callback_data="noop"),   b["banth+"]],
+        [b["cats_m"], b["cats_b"]],
+        [b["close"]],
     ])
-    return text, keyboard
 
 
-def category_menu(chat_id: int, cat_type: str) -> tuple[str, InlineKeyboardMarkup]:
-    s   = get_settings(chat_id)
+async def category_menu(chat_id: int, cat_type: str) -> tuple[str, InlineKeyboardMarkup]:
+    s   = await get_settings(chat_id)
     key = "instant_mute_categories" if cat_type == "mute" else "instant_block_categories"
     current = s[key]
-    label   = "Instant Mute" if cat_type == "mute" else "Instant Ban"
     rows = [
         [InlineKeyboardButton(
             f"{'✅' if c in current else '☐'} {c}",
@@ -437,7 +629,58 @@ def category_menu(chat_id: int, cat_type: str) -> tuple[str, InlineKeyboardMarku
         for c in ALL_CATEGORIES
     ]
     rows.append([InlineKeyboardButton("← Back", callback_data=f"stg|{chat_id}|back|")])
-    return f"⚡ *{esc(label)} Categories*\nTap to toggle:", InlineKeyboardMarkup(rows)
+    title = CATEGORY_TITLE_MUTE if cat_type == "mute" else CATEGORY_TITLE_BLOCK
+    return title, InlineKeyboardMarkup(rows)
+
+
+# ═══════════════════════════════════════════════
+# STATIC MESSAGES (MarkdownV2, pre-escaped)
+# ═══════════════════════════════════════════════
+
+START_TEXT_HEAD = "👋 Hi, "
+START_TEXT_TAIL = (
+    "\\!\n\n"
+    "I'm *Mokosh* — an AI\\-powered harassment detection bot\\.\n\n"
+    "I monitor group chats and detect harmful messages automatically\\.\n\n"
+    "*What I can analyze:*\n"
+    "💬 Text messages\n"
+    "🖼 Photos \\& GIFs\n"
+    "🎙 Voice messages\n"
+    "🎥 Videos\n\n"
+    "*What I do when I find something bad:*\n"
+    "⚠️ Warn the sender\n"
+    "🔇 Mute repeat offenders\n"
+    "🚫 Ban users with severe violations\n\n"
+    "*Commands:*\n"
+    "`/check <text>` — analyze any text\n"
+    "`/settings` — configure moderation \\(admins\\)\n\n"
+    "Add me to your group using the button below 👇"
+)
+
+START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ Add me to a group", url=f"https://t.me/{BOT_USERNAME}?startgroup=true")],
+    [InlineKeyboardButton("📖 How it works", callback_data="how_it_works")],
+])
+
+HOW_IT_WORKS_TEXT = (
+    "🤖 *How Mokosh works:*\n\n"
+    "1\\. Add me to your group as *admin*\n"
+    "   _\\(Delete messages, Ban users, Restrict members\\)_\n\n"
+    "2\\. I silently watch every message\n\n"
+    "3\\. I analyze *text*, *photos*, *voice*, *GIFs* and *video* via the Mokosh API\n\n"
+    "4\\. On violations: warn → mute → ban\n\n"
+    "Use `/check <text>` to manually test any message\\.\n"
+    "Use `/settings` \\(admins\\) to customize behavior\\."
+)
+
+WELCOME_GROUP_TEXT = (
+    "👋 Hello everyone\\! I'm *Mokosh*, your AI safety moderator\\.\n\n"
+    "I analyze *text*, *photos*, *voice messages*, *GIFs* and *videos* for harmful content\\.\n\n"
+    "Admins: use `/settings` to configure moderation\\.\n"
+    "Anyone: use `/check <text>` to test a message\\.\n\n"
+    "⚠️ *Give me admin rights* \\(delete messages \\+ restrict users\\) to act on violations\\.\n\n"
+    "Stay respectful\\! 🛡️"
+)
 
 
 # ═══════════════════════════════════════════════
@@ -447,31 +690,10 @@ def category_menu(chat_id: int, cat_type: str) -> tuple[str, InlineKeyboardMarku
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user       = update.effective_user
     first_name = esc(user.first_name if user else "there")
-    url        = f"https://t.me/{BOT_USERNAME}?startgroup=true"
-
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("➕ Add me to a group", url=url)],
-        [InlineKeyboardButton("📖 How it works", callback_data="how_it_works")],
-    ])
     await update.message.reply_text(
-        f"👋 Hi, {first_name}\\!\n\n"
-        "I'm *Mokosh* — an AI\\-powered harassment detection bot\\.\n\n"
-        "I monitor group chats and detect harmful messages automatically\\.\n\n"
-        "*What I can analyze:*\n"
-        "💬 Text messages\n"
-        "🖼 Photos \\& GIFs\n"
-        "🎙 Voice messages\n"
-        "🎥 Videos\n\n"
-        "*What I do when I find something bad:*\n"
-        "⚠️ Warn the sender\n"
-        "🔇 Mute repeat offenders\n"
-        "🚫 Ban users with severe violations\n\n"
-        "*Commands:*\n"
-        "`/check <text>` — analyze any text\n"
-        "`/settings` — configure moderation \\(admins\\)\n\n"
-        "Add me to your group using the button below 👇",
+        START_TEXT_HEAD + first_name + START_TEXT_TAIL,
         parse_mode="MarkdownV2",
-        reply_markup=keyboard,
+        reply_markup=START_KEYBOARD,
     )
 
 
@@ -488,7 +710,7 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     is_group = message.chat.type in ("group", "supergroup")
-    settings = get_settings(message.chat_id) if is_group else dict(DEFAULT_SETTINGS)
+    settings = await get_settings(message.chat_id) if is_group else dict(DEFAULT_SETTINGS)
 
     await message.reply_text("🔍 Analyzing\\.\\.\\.", parse_mode="MarkdownV2")
 
@@ -530,7 +752,7 @@ async def cmd_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await is_admin(update, context):
         await message.reply_text("🔒 Only group admins can change settings\\.", parse_mode="MarkdownV2")
         return
-    text, keyboard = settings_menu(update.effective_chat.id)
+    text, keyboard = await settings_menu(update.effective_chat.id)
     await message.reply_text(text, parse_mode="MarkdownV2", reply_markup=keyboard)
 
 
@@ -538,6 +760,46 @@ async def cmd_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # SETTINGS CALLBACK
 # ═══════════════════════════════════════════════
 
+# ─── settings panel actions ───
+# Each mutates the settings dict in place; param is the raw callback suffix.
+
+def _step(param: str, step):
+    return step if param == "+" else -step
+
+
+def _do_toggle(s: dict, param: str):
+    s[param] = not s[param]
+
+
+def _do_conf(s: dict, param: str):
+    val = round(s["min_confidence_for_action"] + _step(param, 0.05), 2)
+    s["min_confidence_for_action"] = max(0.0, min(1.0, val))
+
+
+def _do_mute(s: dict, param: str):
+    val = s["mute_minutes"] + _step(param, 15)
+    s["mute_minutes"] = max(1, min(10080, val))
+
+
+def _do_muteth(s: dict, param: str):
+    val = s["mute_threshold_violations"] + _step(param, 1)
+    s["mute_threshold_violations"] = max(1, min(100, val))
+
+
+def _do_banth(s: dict, param: str):
+    val = s["block_threshold_violations"] + _step(param, 1)
+    s["block_threshold_violations"] = max(1, min(100, val))
+
+
+_ACTIONS = {
+    "toggle": _do_toggle,
+    "conf":   _do_conf,
+    "mute":   _do_mute,
+    "muteth": _do_muteth,
+    "banth":  _do_banth,
+}
+
+
 async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -547,17 +809,7 @@ async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if data == "how_it_works":
-        await query.message.reply_text(
-            "🤖 *How Mokosh works:*\n\n"
-            "1\\. Add me to your group as *admin*\n"
-            "   _\\(Delete messages, Ban users, Restrict members\\)_\n\n"
-            "2\\. I silently watch every message\n\n"
-            "3\\. I analyze *text*, *photos*, *voice*, *GIFs* and *video* via the Mokosh API\n\n"
-            "4\\. On violations: warn → mute → ban\n\n"
-            "Use `/check <text>` to manually test any message\\.\n"
-            "Use `/settings` \\(admins\\) to customize behavior\\.",
-            parse_mode="MarkdownV2",
-        )
+        await query.message.reply_text(HOW_IT_WORKS_TEXT, parse_mode="MarkdownV2")
         return
 
     if not data.startswith("stg|"):
@@ -567,40 +819,25 @@ async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = int(chat_id_str)
 
     try:
-        member = await context.bot.get_chat_member(chat_id, query.from_user.id)
-        if member.status not in ("administrator", "creator"):
+        if not await check_admin(context.bot, chat_id, query.from_user.id):
             await query.answer("🔒 Admins only.", show_alert=True)
             return
     except Exception:
         await query.answer("🔒 Could not verify admin status.", show_alert=True)
         return
 
-    s = get_settings(chat_id)
+    s = await get_settings(chat_id)
 
     if action == "close":
         await query.message.delete()
         return
     elif action == "back":
-        text, kb = settings_menu(chat_id)
+        text, kb = await settings_menu(chat_id)
         await query.message.edit_text(text, parse_mode="MarkdownV2", reply_markup=kb)
         return
-    elif action == "toggle":
-        s[param] = not s[param]
-    elif action == "conf":
-        val = round(s["min_confidence_for_action"] + (0.05 if param == "+" else -0.05), 2)
-        s["min_confidence_for_action"] = max(0.0, min(1.0, val))
-    elif action == "mute":
-        val = s["mute_minutes"] + (15 if param == "+" else -15)
-        s["mute_minutes"] = max(1, min(10080, val))
-    elif action == "muteth":
-        val = s["mute_threshold_violations"] + (1 if param == "+" else -1)
-        s["mute_threshold_violations"] = max(1, min(100, val))
-    elif action == "banth":
-        val = s["block_threshold_violations"] + (1 if param == "+" else -1)
-        s["block_threshold_violations"] = max(1, min(100, val))
     elif action == "cats":
-        save_settings(chat_id, s)
-        text, kb = category_menu(chat_id, param)
+        await save_settings(chat_id, s)
+        text, kb = await category_menu(chat_id, param)
         await query.message.edit_text(text, parse_mode="MarkdownV2", reply_markup=kb)
         return
     elif action == "cattoggle":
@@ -609,13 +846,17 @@ async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cats = s[key]
         cats.remove(cat_name) if cat_name in cats else cats.append(cat_name)
         s[key] = cats
-        save_settings(chat_id, s)
-        text, kb = category_menu(chat_id, cat_type)
+        await save_settings(chat_id, s)
+        text, kb = await category_menu(chat_id, cat_type)
         await query.message.edit_text(text, parse_mode="MarkdownV2", reply_markup=kb)
         return
 
-    save_settings(chat_id, s)
-    text, kb = settings_menu(chat_id)
+    handler = _ACTIONS.get(action)
+    if handler is None:
+        return
+    handler(s, param)
+    await save_settings(chat_id, s)
+    text, kb = await settings_menu(chat_id)
     await query.message.edit_text(text, parse_mode="MarkdownV2", reply_markup=kb)
 
 
@@ -626,30 +867,31 @@ async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def on_bot_added(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for member in update.message.new_chat_members:
         if member.id == context.bot.id:
-            await update.message.reply_text(
-                "👋 Hello everyone\\! I'm *Mokosh*, your AI safety moderator\\.\n\n"
-                "I analyze *text*, *photos*, *voice messages*, *GIFs* and *videos* for harmful content\\.\n\n"
-                "Admins: use `/settings` to configure moderation\\.\n"
-                "Anyone: use `/check <text>` to test a message\\.\n\n"
-                "⚠️ *Give me admin rights* \\(delete messages \\+ restrict users\\) to act on violations\\.\n\n"
-                "Stay respectful\\! 🛡️",
-                parse_mode="MarkdownV2",
-            )
+            await update.message.reply_text(WELCOME_GROUP_TEXT, parse_mode="MarkdownV2")
             break
 
 
+# Each handler only runs the cheap filters, then hands the download/analysis
+# to a background task so one slow API call never holds up other updates.
+
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.message
     if not message or not message.text:
         return
     if message.chat.type not in ("group", "supergroup"):
         return
+    if is_trivial_text(message.text):
+        return
+    context.application.create_task(_process_text(update, context), update=update)
+
 
+async def _process_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message        = update.message
     sender_id      = message.from_user.id
     sender_display = message.from_user.username or message.from_user.first_name
     chat_id        = message.chat_id
-    prior          = get_violations(chat_id, sender_id)
-    settings       = get_settings(chat_id)
+    prior          = await get_violations(chat_id, sender_id)
+    settings       = await get_settings(chat_id)
 
     result = await api_text(message.text, str(sender_id), sender_display, prior, settings)
     if result and is_bad_result(result):
@@ -664,19 +906,29 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     voice = message.voice or message.audio
     if not voice:
         return
+    context.application.create_task(_process_voice(update, context, voice), update=update)
+
 
+async def _process_voice(update: Update, context: ContextTypes.DEFAULT_TYPE, voice):
+    message        = update.message
     sender_id      = message.from_user.id
     sender_display = message.from_user.username or message.from_user.first_name
     chat_id        = message.chat_id
-    prior          = get_violations(chat_id, sender_id)
+    prior          = await get_violations(chat_id, sender_id)
 
-    try:
-        file_bytes = await download_file(context.bot, voice.file_id)
-    except Exception as e:
-        print(f"[ERROR] Voice download failed: {e}")
-        return
+    key    = (voice.file_unique_id, None)
+    result = _MEDIA_VERDICT.get(key)
+    if result is None:
+        async with MEDIA_SEM:
+            with io.BytesIO() as file:
+                try:
+                    await download_file(context.bot, voice.file_id, file)
+                except Exception:
+                    LOG.exception("Voice download failed")
+                    return
+                result = await api_audio(file, "voice.ogg", prior, sender_display)
+        remember_media_verdict(key, result)
 
-    result = await api_audio(file_bytes, "voice.ogg", prior, sender_display)
     if result and is_bad_result(result):
         await apply_verdict(update, context, result, chat_id, sender_id, media_label="🎙 Voice")
 
@@ -689,20 +941,33 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     photo = message.photo[-1] if message.photo else None
     if not photo:
         return
+    context.application.create_task(_process_photo(update, context, photo), update=update)
+
 
+async def _process_photo(update: Update, context: ContextTypes.DEFAULT_TYPE, photo):
+    message        = update.message
     sender_id      = message.from_user.id
     sender_display = message.from_user.username or message.from_user.first_name
     chat_id        = message.chat_id
-    prior          = get_violations(chat_id, sender_id)
+    prior          = await get_violations(chat_id, sender_id)
     caption        = message.caption or None
 
-    try:
-        file_bytes = await download_file(context.bot, photo.file_id)
-    except Exception as e:
-        print(f"[ERROR] Photo download failed: {e}")
-        return
+    key    = (photo.file_unique_id, caption)
+    result = _MEDIA_VERDICT.get(key)
+    if result is None:
+        async with MEDIA_SEM:
+            with io.BytesIO() as file:
+                try:
+                    await download_file(context.bot, photo.file_id, file)
+                except Exception:
+                    LOG.exception("Photo download failed")
+                    return
+                if not looks_like_image(sniff(file)):
+                    LOG.info("skip: photo is not a known image format")
+                    return
+                result = await api_image(file, "photo.jpg", caption, prior, sender_display)
+        remember_media_verdict(key, result)
 
-    result = await api_image(file_bytes, "photo.jpg", caption, prior, sender_display)
     if result and is_bad_result(result):
         await apply_verdict(update, context, result, chat_id, sender_id, media_label="🖼 Photo")
 
@@ -716,25 +981,38 @@ async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not video:
         return
 
-    sender_id      = message.from_user.id
-    sender_display = message.from_user.username or message.from_user.first_name
-    chat_id        = message.chat_id
-    prior          = get_violations(chat_id, sender_id)
-    caption        = message.caption or None
-
     # Telegram bot download limit is 20MB
     if hasattr(video, "file_size") and video.file_size and video.file_size > 20 * 1024 * 1024:
-        print(f"[SKIP] File too large: {video.file_size} bytes")
+        LOG.info("skip: file too large: %d bytes", video.file_size)
         return
+    context.application.create_task(_process_video(update, context, video), update=update)
 
-    try:
-        file_bytes = await download_file(context.bot, video.file_id)
-    except Exception as e:
-        print(f"[ERROR] Video download failed: {e}")
-        return
 
-    label  = "🎞 GIF" if message.animation else "🎥 Video"
-    result = await api_video(file_bytes, "video.mp4", caption, prior, sender_display)
+async def _process_video(update: Update, context: ContextTypes.DEFAULT_TYPE, video):
+    message        = update.message
+    sender_id      = message.from_user.id
+    sender_display = message.from_user.username or message.from_user.first_name
+    chat_id        = message.chat_id
+    prior          = await get_violations(chat_id, sender_id)
+    caption        = message.caption or None
+
+    key    = (video.file_unique_id, caption)
+    result = _MEDIA_VERDICT.get(key)
+    if result is None:
+        async with MEDIA_SEM:
+            with io.BytesIO() as file:
+                try:
+                    await download_file(context.bot, video.file_id, file)
+                except Exception:
+                    LOG.exception("Video download failed")
+                    return
+                if not looks_like_video(sniff(file)):
+                    LOG.info("skip: video is not a known container format")
+                    return
+                result = await api_video(file, "video.mp4", caption, prior, sender_display)
+        remember_media_verdict(key, result)
+
+    label = "🎞 GIF" if message.animation else "🎥 Video"
     if result and is_bad_result(result):
         await apply_verdict(update, context, result, chat_id, sender_id, media_label=label)
 
@@ -744,19 +1022,32 @@ async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ═══════════════════════════════════════════════
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
     init_db()
 
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(TELEGRAM_TOKEN)
+        # Stay under Telegram's flood limits (~30 msg/s per bot, 20 msg/min per group)
+        .rate_limiter(AIORateLimiter(overall_max_rate=29, group_max_rate=20, max_retries=3))
+        .post_init(open_http_clients)
+        .post_shutdown(close_http_clients)
+        .build()
+    )
 
     app.add_handler(CommandHandler("start",    cmd_start))
     app.add_handler(CommandHandler("check",    cmd_check))
     app.add_handler(CommandHandler("settings", cmd_settings))
     app.add_handler(CallbackQueryHandler(settings_callback))
     app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, on_bot_added))
+    app.add_handler(ChatMemberHandler(on_chat_member_update, ChatMemberHandler.CHAT_MEMBER))
     app.add_handler(MessageHandler(filters.TEXT   & ~filters.COMMAND,     handle_text))
     app.add_handler(MessageHandler(filters.VOICE  | filters.AUDIO,        handle_voice))
     app.add_handler(MessageHandler(filters.PHOTO,                          handle_photo))
     app.add_handler(MessageHandler(filters.VIDEO  | filters.ANIMATION,    handle_video))
 
     print("🤖 Mokosh is running — text / voice / photo / video / GIF moderation active...")
-    app.run_polling()
\ No newline at end of file
+    app.run_polling(allowed_updates=Update.ALL_TYPES)   # chat_member updates are opt-in
\ No newline at end of file